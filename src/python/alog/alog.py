@@ -29,12 +29,29 @@ configurable formatting and scoped loggers.
 import functools
 import json
 import logging
+import re
 import sys
 import threading
 import time
-import traceback
-from datetime import datetime, timedelta
-from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Type, Union
+from datetime import timedelta
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
+
+# orjson is an optional encoder that the json formatter can be configured to use
+try:
+    # Third Party
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
 
 if TYPE_CHECKING:
     from .protocols import ALogLoggerProtocol
@@ -45,17 +62,54 @@ _Level = Union[int, str]
 
 g_thread_id_enabled = False
 
+# Cache of the most recently formatted (second, "YYYY-MM-DDTHH:MM:SS") timestamp
+# prefix. This is replaced as a single tuple so it is safe to share across
+# threads.
+g_formatted_time_sec: Tuple[int, str] = (-1, "")
+
+# Sentinel used to distinguish missing record attributes from None values
+_MISSING = object()
+
+# Shared sorted-key encoder for the json formatter
+_json_encode = json.JSONEncoder(sort_keys=True).encode
+
+
+def _orjson_dumps(obj: Dict[Any, Any]) -> str:
+    """Encode with orjson, falling back to the standard encoder for values
+    that orjson does not support (e.g. integers wider than 64 bits).
+    """
+    try:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS).decode("utf-8")
+    except TypeError:
+        return _json_encode(obj)
+
 
 class AlogFormatterBase(logging.Formatter):
     """Base class with common functionality for alog formatters."""
 
+    _INDENT = "  "
+
     class ThreadLocalIndent(threading.local):
         """Private subclass of threading.local which initializes to 0 on
-        construction
+        construction. The indentation string for the current count is kept
+        alongside it so that it doesn't need to be rebuilt for every record,
+        and is updated whenever the count is set. Since this is initialized
+        once per thread, it also holds the thread id.
         """
 
-        def __init__(self) -> None:
+        def __init__(self, indent_unit: str = "  ") -> None:
+            self._indent_unit = indent_unit
             self.indent = 0
+            self.tid = threading.get_ident()
+
+        @property
+        def indent(self) -> int:
+            return self._num_indent
+
+        @indent.setter
+        def indent(self, num_indent: int) -> None:
+            self._num_indent = num_indent
+            self.indent_str = self._indent_unit * num_indent
 
         def __getstate__(self) -> None:
             return None
@@ -68,7 +122,7 @@ class AlogFormatterBase(logging.Formatter):
         # kept independently for each thread. Note that threading.local values
         # are cleaned up when their local thread dies, so this is safe to use
         # with ephemeral threads.
-        self._indent = self.ThreadLocalIndent()
+        self._indent = self.ThreadLocalIndent(self._INDENT)
 
         # Initialize the underlying logger with this formatter
         logging.Formatter.__init__(self)
@@ -86,7 +140,22 @@ class AlogFormatterBase(logging.Formatter):
         Returns:
             A string representation of created datetime.
         """
-        return datetime.utcfromtimestamp(record.created).isoformat()
+        # The second-resolution prefix only changes once per second, so it is
+        # cached and only the microseconds are formatted per record. The
+        # microseconds are rounded the same way datetime does, which may carry
+        # over into the next second.
+        global g_formatted_time_sec
+        created = record.created
+        sec = int(created)
+        usec = round((created - sec) * 1000000)
+        if usec >= 1000000:
+            sec += 1
+            usec -= 1000000
+        cached_sec, prefix = g_formatted_time_sec
+        if sec != cached_sec:
+            prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(sec))
+            g_formatted_time_sec = (sec, prefix)
+        return "%s.%06d" % (prefix, usec)
 
     def indent(self) -> None:
         """Add a level of indentation for this thread."""
@@ -94,42 +163,47 @@ class AlogFormatterBase(logging.Formatter):
 
     def deindent(self) -> None:
         """Remove a level of indentation for this thread."""
-        if self._indent.indent > 0:
-            self._indent.indent -= 1
+        thread_indent = self._indent
+        num_indent = thread_indent.indent
+        if num_indent > 0:
+            thread_indent.indent = num_indent - 1
 
 
 class AlogJsonFormatter(AlogFormatterBase):
     """Log formatter which prints messages a single-line json."""
 
-    _FIELDS_TO_PRINT: List[str] = [
-        "name",
-        "levelname",
-        "asctime",
-        "message",
-        "exc_text",
-        "region-id",
-        "org-id",
-        "tran-id",
-        "watson-txn-id",
-        "channel",
-        "duration",
-    ]
+    # Map from the record attributes to print to the key they are printed
+    # under. Order matters since dict-valued fields are merged into the output
+    # in this order.
+    _FIELD_MAP: Dict[str, str] = {
+        "name": "channel",
+        "levelname": "level",
+        "asctime": "timestamp",
+        "message": "message",
+        "exc_text": "exception",
+        "region-id": "region-id",
+        "org-id": "org-id",
+        "tran-id": "tran-id",
+        "watson-txn-id": "watson-txn-id",
+        "channel": "channel",
+        "duration": "duration",
+    }
+
+    def __init__(self, use_orjson: bool = False) -> None:
+        """Construct the formatter.
 
-    def __init__(self) -> None:
+        Args:
+            use_orjson (bool):  If true, encode records with orjson. Note that
+                orjson output is compact and does not escape non-ASCII
+                characters, so it differs from the standard json output.
+        """
         AlogFormatterBase.__init__(self)
+        if use_orjson and orjson is None:
+            raise ValueError("use_orjson requires the orjson package")
 
-    @staticmethod
-    def _map_to_common_key_name(log_record_keyname: str) -> str:
-        if log_record_keyname == "levelname":
-            return "level"
-        elif log_record_keyname == "asctime":
-            return "timestamp"
-        elif log_record_keyname == "exc_text":
-            return "exception"
-        elif log_record_keyname == "name":
-            return "channel"
-        else:
-            return log_record_keyname
+        # Reuse a single encoder rather than having json.dumps construct a new
+        # one for every record
+        self._encode = _orjson_dumps if use_orjson else _json_encode
 
     def _extract_fields_from_record_as_dict(self, record: logging.LogRecord):
         """Extracts the fields we want out of log record and puts them into an
@@ -142,14 +216,18 @@ class AlogJsonFormatter(AlogFormatterBase):
             The relevant fields pulled out from the log record object and
             initialized into a dictionary.
         """
+        # All of the fields live in the record's instance dict, so read them
+        # from it directly rather than going through attribute lookup
+        record_dict = record.__dict__
         out: Dict[Any, Any] = {}
-        for field_name in self._FIELDS_TO_PRINT:
-            if hasattr(record, field_name):
-                record_field = getattr(record, field_name)
-                if isinstance(record_field, dict):
-                    out.update(record_field)
-                else:
-                    out[self._map_to_common_key_name(field_name)] = record_field
+        for field_name, key_name in self._FIELD_MAP.items():
+            record_field = record_dict.get(field_name, _MISSING)
+            if record_field is _MISSING:
+                continue
+            if isinstance(record_field, dict):
+                out.update(record_field)
+            else:
+                out[key_name] = record_field
 
         out["level"] = out["level"].lower()
         return out
@@ -180,11 +258,12 @@ class AlogJsonFormatter(AlogFormatterBase):
         log_record = self._extract_fields_from_record_as_dict(record)
 
         # Add indent to all log records
-        log_record["num_indent"] = self._indent.indent
+        thread_indent = self._indent
+        log_record["num_indent"] = thread_indent.indent
 
         # If enabled, add thread id
         if g_thread_id_enabled:
-            log_record["thread_id"] = threading.get_ident()
+            log_record["thread_id"] = thread_indent.tid
 
         # Interpolate message and args if present
         record_args = log_record.pop("args", None)
@@ -195,13 +274,12 @@ class AlogJsonFormatter(AlogFormatterBase):
             else:
                 log_record["message"] = str(record_args)
 
-        return json.dumps(log_record, sort_keys=True)
+        return self._encode(log_record)
 
 
 class AlogPrettyFormatter(AlogFormatterBase):
     """Log formatter that pretty-prints lines for easy visibility."""
 
-    _INDENT = "  "
     _LEVEL_MAP: Dict[str, str] = {
         "critical": "FATL",
         "fatal": "FATL",
@@ -216,91 +294,103 @@ class AlogPrettyFormatter(AlogFormatterBase):
         "debug4": "DBG4",
     }
 
+    # Upper bound on the number of (channel, level) header fragments to cache
+    _CHAN_LVL_CACHE_MAX = 1024
+
     def __init__(self, channel_len=5) -> None:
         AlogFormatterBase.__init__(self)
         self.channel_len = channel_len
 
+        # Cache of (channel, level, channel_len) -> "CHANL:LEVL" header fragment.
+        # There are very few distinct keys in a given process, so this avoids
+        # redoing the padding and level mapping for every record.
+        self._chan_lvl_cache: Dict[Tuple[str, str, int], str] = {}
+
+    def _format_chan_lvl(self, channel: str, level: str) -> str:
+        """Create the padded or truncated channel and the mapped level."""
+        chan = channel.ljust(self.channel_len)[: self.channel_len]
+        lvl = self._LEVEL_MAP.get(level.lower(), "UNKN")
+        return "%s:%s" % (chan, lvl)
+
     def _make_header(
         self, timestamp: str, channel: str, level: str, log_code: Optional[str]
     ) -> str:
         """Create the header for a log line with proper padding."""
-        # Get the padded or truncated channel
-        chan = channel
-        if len(channel) > self.channel_len:
-            chan = channel[: self.channel_len]
-
-        elif len(channel) < self.channel_len:
-            chan = channel + " " * (self.channel_len - len(channel))
-
-        # Get the mapped level
-        lvl = self._LEVEL_MAP.get(level.lower(), "UNKN")
-
-        # If thread id enabled, add it
-        header = "%s [%s:%s" % (timestamp, chan, lvl)
+        # Get the padded channel and mapped level
+        key = (channel, level, self.channel_len)
+        chan_lvl = self._chan_lvl_cache.get(key)
+        if chan_lvl is None:
+            if len(self._chan_lvl_cache) >= self._CHAN_LVL_CACHE_MAX:
+                self._chan_lvl_cache.clear()
+            chan_lvl = self._format_chan_lvl(channel, level)
+            self._chan_lvl_cache[key] = chan_lvl
+
+        # Build the header with a single format, including the thread id if
+        # enabled and the log code if present
         if g_thread_id_enabled:
-            header += ":%d" % threading.get_ident()
-        header += "]"
-
-        # Add log code if present
+            tid = self._indent.tid
+            if log_code is not None:
+                return "%s [%s:%d] %s" % (timestamp, chan_lvl, tid, log_code)
+            return "%s [%s:%d]" % (timestamp, chan_lvl, tid)
         if log_code is not None:
-            header += " %s" % log_code
-
-        return header
+            return "%s [%s] %s" % (timestamp, chan_lvl, log_code)
+        return "%s [%s]" % (timestamp, chan_lvl)
 
     def format(self, record: logging.LogRecord) -> str:
         """Formats the log record as pretty-printed lines of the format:
 
         timestamp [CHANL:LEVL] message
         """
-        # Extract special values from the message if it's a dict
-        metadata = None
-        if isinstance(record.msg, dict):
-            if "message" in record.msg:
-                message = record.msg.pop("message")
-                args = record.msg.pop("args", None)
+        msg = record.msg
+        log_code = getattr(record, "log_code", None)
+        if isinstance(msg, dict):
+            # Extract special values from the message dict without
+            # modifying the caller's dict
+            if "message" in msg:
+                message = msg["message"]
+                args = msg.get("args")
                 if args:
                     message = message % args
-                record.message = message
-            if "log_code" in record.msg:
-                record.log_code = record.msg.pop("log_code")
-            metadata = record.msg
+                special_keys: Tuple[str, ...] = ("message", "args", "log_code")
+            else:
+                message = ""
+                special_keys = ("log_code",)
+            if "log_code" in msg:
+                log_code = msg["log_code"]
+                record.log_code = log_code  # type: ignore
+
+            # Add metadata if present
+            metadata = {k: v for k, v in msg.items() if k not in special_keys}
+            if metadata:
+                if len(message) > 0:
+                    message += " "
+                message += json.dumps(metadata)
         else:
-            record.message = record.getMessage()
-
-        # Add metadata if present
-        if not hasattr(record, "message"):
-            record.message = ""
-        if metadata is not None and len(metadata) > 0:
-            if len(record.message) > 0:
-                record.message += " "
-            record.message += json.dumps(metadata)
+            message = record.getMessage()
+        record.message = message
 
         level = record.levelname
         channel = record.name
         timestamp = self.formatTime(record, self.datefmt)
-        log_code = record.log_code if hasattr(record, "log_code") else None  # type: ignore
         header = self._make_header(timestamp, channel, level, log_code)
         # Pretty format the message
-        indent = self._INDENT * self._indent.indent
-        if isinstance(record.message, str):
-            formatted = [
-                "%s %s%s" % (header, indent, line)
-                for line in record.message.split("\n")
-            ]
-        else:
-            formatted = ["%s %s%s" % (header, indent, str(record.message))]
+        indent = self._indent.indent_str
+
+        # Most messages are a single line without a stack trace, so skip the
+        # split/join for that case
+        if isinstance(message, str) and "\n" not in message and not record.exc_info:
+            return "%s %s%s" % (header, indent, message)
+
+        # Prefix every line with the header by joining the lines on a
+        # newline + prefix separator so no per-line fragments are allocated
+        prefix = "%s %s" % (header, indent)
+        lines = message.split("\n") if isinstance(message, str) else [str(message)]
 
         # Add stack trace if present
         if record.exc_info:
-            formatted.extend(
-                [
-                    "%s %s%s" % (header, indent, line)
-                    for line in self.formatException(record.exc_info).split("\n")
-                ]
-            )
+            lines.extend(self.formatException(record.exc_info).split("\n"))
 
-        formatted = "\n".join(formatted)
-        return formatted
+        return prefix + ("\n" + prefix).join(lines)
 
 
 ## Constants ###################################################################
@@ -323,6 +413,11 @@ g_alog_level_to_name.update(
     }
 )
 
+# Patterns for a single "CHAN:level" filter entry and a full, well-formed filter
+# string made up of comma-separated entries
+_FILTER_ENTRY_RE = re.compile(r"([^,:]+):([^,:]+)")
+_FILTER_STR_RE = re.compile(r"[^,:]+:[^,:]+(?:,[^,:]+:[^,:]+)*")
+
 # Special "level" used to disable all logging
 g_disable_level = "disable"
 
@@ -330,6 +425,9 @@ g_alog_name_to_level: Dict[str, int] = {
     name: level for level, name in g_alog_level_to_name.items()
 }
 
+# Set of all valid level names for fast membership checks
+_VALID_LEVEL_NAMES = frozenset(g_alog_name_to_level)
+
 # Global map of default formatters
 g_alog_formatters: Dict[str, Type[AlogFormatterBase]] = {
     "json": AlogJsonFormatter,
@@ -369,10 +467,9 @@ class _MultiEqualString:
 # work on python 3.6 and 3.7.
 def _set_stacklevel(stacklevel: int = 1, **kwargs):
     if sys.version_info >= (3, 8, 0, "", 0):  # type: ignore
-        # Pop 2 additional levels off the stack:
-        #   - _log_with_code_method_override
-        #   - inline lambda
-        kwargs["stacklevel"] = stacklevel + 2
+        # Pop 1 additional level off the stack for the level function created
+        # by _add_level_fn
+        kwargs["stacklevel"] = stacklevel + 1
 
     # If this is an old version of python, we overwrite logging._srcfile with a
     # _MultiEqualString so that _this_ file will also match True to stack frames
@@ -385,8 +482,8 @@ def _set_stacklevel(stacklevel: int = 1, **kwargs):
     return kwargs
 
 
-def is_log_code(arg: str) -> bool:
-    return arg.startswith("<") and arg.endswith(">")
+def is_log_code(arg: object) -> bool:
+    return isinstance(arg, str) and len(arg) > 1 and arg[0] == "<" and arg[-1] == ">"
 
 
 def _get_level_value(level_name: _Level) -> Optional[int]:
@@ -401,56 +498,53 @@ def _get_level_value(level_name: _Level) -> Optional[int]:
         logging.warning("Invalid log level: %s", level_name)
 
 
-def _log_with_code_method_override(
-    self: logging.Logger, value: int, arg_one: object, *args: object, **kwargs
-) -> None:
-    """This helper is used as an override to the native logging.Logger instance
-    methods for each level. As such, it's first argument, self, is the logger
-    instance (or the global root logger singleton) on which to call the method.
-    Having this as the first argument allows it to override the native methods
-    and support functionality like:
-
-    ch = alog.use_channel('FOO')
-    ch.debug('<FOO80349757I>', 'Logging is fun!')
-    """
-
-    # If this level is disabled, don't do any of the other expensive work here
-    if not self.isEnabledFor(value):
-        return
+def _add_level_fn(name: str, value: int) -> None:
+    logging.addLevelName(value, name.upper())
 
-    # Update the stacklevel in a version-safe way to avoid identifying this
-    # wrapper as the source of the logging message
-    kwargs = _set_stacklevel(**kwargs)
-
-    # If no positional args, arg_one is message
-    if not args:
-        self.log(value, arg_one, **kwargs)
-
-    # If arg_one looks like a log code, use the first positional arg as message
-    elif is_log_code(arg_one):
-        self.log(
-            value,
-            {
-                "log_code": arg_one,
-                "message": args[0],
-                "args": tuple(args[1:]) if len(args) > 1 else None,
-            },
-            **kwargs,
-        )
-
-    # Otherwise, treat arg_one as the message
-    else:
-        self.log(value, arg_one, *args, **kwargs)
+    # The level function is built once per level as a closure over the level
+    # value so that the level check and dispatch are all done in a single frame
+    def log_using_self_func(
+        self: logging.Logger, arg_one: object, *args: object, **kwargs
+    ) -> None:
+        """This function is used as an override to the native logging.Logger
+        instance methods for each level. As such, it's first argument, self, is
+        the logger instance (or the global root logger singleton) on which to
+        call the method. Having this as the first argument allows it to
+        override the native methods and support functionality like:
+
+        ch = alog.use_channel('FOO')
+        ch.debug('<FOO80349757I>', 'Logging is fun!')
+        """
 
+        # If this level is disabled, don't do any of the other expensive work
+        if not self.isEnabledFor(value):
+            return
+
+        # Update the stacklevel in a version-safe way to avoid identifying this
+        # wrapper as the source of the logging message
+        kwargs = _set_stacklevel(**kwargs)
+
+        # If no positional args, arg_one is message
+        if not args:
+            self.log(value, arg_one, **kwargs)
+
+        # If arg_one looks like a log code, use the first positional arg as
+        # message
+        elif is_log_code(arg_one):
+            self.log(
+                value,
+                {
+                    "log_code": arg_one,
+                    "message": args[0],
+                    "args": tuple(args[1:]) if len(args) > 1 else None,
+                },
+                **kwargs,
+            )
 
-def _add_level_fn(name: str, value: int) -> None:
-    logging.addLevelName(value, name.upper())
+        # Otherwise, treat arg_one as the message
+        else:
+            self.log(value, arg_one, *args, **kwargs)
 
-    log_using_self_func = (
-        lambda self, arg_one, *args, **kwargs: _log_with_code_method_override(
-            self, value, arg_one, *args, **kwargs
-        )
-    )
     setattr(log_using_self_func, "_level_value", value)
     setattr(logging.Logger, name, log_using_self_func)
 
@@ -500,32 +594,49 @@ def _parse_filters(filters: Union[str, Dict[str, _Level]]) -> Dict[str, _Level]:
 
 
 def _parse_dict_of_filters(filters: Dict[str, _Level]) -> Dict[str, _Level]:
+    # Build a new dict rather than deleting from the caller's dict while
+    # iterating over it. Level names are checked with a single set lookup
+    # before falling back to the full (numeric) level parsing.
+    valid_names = _VALID_LEVEL_NAMES
+    parsed_filters: Dict[str, _Level] = {}
     for entry, level_name in filters.items():
-        if _get_level_value(level_name) is None:
+        if level_name in valid_names or _get_level_value(level_name) is not None:
+            parsed_filters[entry] = level_name
+        else:
             logging.warning("Invalid filter entry [%s]", entry)
-            del filters[entry]
-    return filters
+    return parsed_filters
 
 
 def _parse_str_of_filters(filters: str) -> Dict[str, _Level]:
+    # Well-formed filter strings are tokenized in a single regex pass. Anything
+    # else is split entry by entry so that each malformed entry is reported.
+    if _FILTER_STR_RE.fullmatch(filters):
+        entries = _FILTER_ENTRY_RE.findall(filters)
+    else:
+        entries = _split_str_of_filters(filters)
+
     chan_map: Dict[str, _Level] = {}
+    for chan, level_name in entries:
+        level = _get_level_value(level_name)
+        if level is None:
+            logging.warning("Invalid level [%s] for channel [%s]", level_name, chan)
+        else:
+            chan_map[chan] = level_name
+    return chan_map
+
+
+def _split_str_of_filters(filters: str) -> List[Tuple[str, str]]:
+    entries = []
     for entry in filters.split(","):
         if len(entry):
             parts = entry.split(":")
             if len(parts) != 2:
                 logging.warning("Invalid filter entry [%s]", entry)
             else:
-                chan, level_name = parts
-                level = _get_level_value(level_name)
-                if level is None:
-                    logging.warning(
-                        "Invalid level [%s] for channel [%s]", level_name, chan
-                    )
-                else:
-                    chan_map[chan] = level_name
+                entries.append((parts[0], parts[1]))
         else:
             logging.warning("Invalid filter entry [%s]", entry)
-    return chan_map
+    return entries
 
 
 ## Import-time Setup ###########################################################
@@ -765,9 +876,8 @@ class FunctionLog(ScopedLog):
     """
 
     def __init__(self, log_fn, format_str="", *args) -> None:
-        fn_name = (
-            traceback.format_stack()[-2].strip().split(",")[2].split(" ")[2].strip()
-        )
+        # Get the name of the calling function directly from its frame
+        fn_name = sys._getframe(1).f_code.co_name
         format_str = "%s(" + format_str + ")"
         super().__init__(log_fn, format_str, fn_name, *args)
 
@@ -26,6 +26,7 @@
 
 # Standard
 from unittest import mock
+import contextlib
 import inspect
 import io
 import json
@@ -155,6 +156,19 @@ def test_configure_reconfigure():
     assert not ch2.isEnabled('info')
     assert not ch2.isEnabled('debug')
 
+def test_configure_identical_reconfigure_new_stderr():
+    '''Test that re-invoking configure with identical arguments rebuilds the
+    handlers so that a replaced sys.stderr is picked up
+    '''
+    alog.configure('info')
+    test_channel = alog.use_channel('TEST')
+
+    stream = io.StringIO()
+    with contextlib.redirect_stderr(stream):
+        alog.configure('info')
+        test_channel.info('Should show up')
+    assert 'Should show up' in stream.getvalue()
+
 def test_configure_configure_multi_formatter():
     '''Make sure that configure correctly removes all previously-configured
     handlers from the logging core.
@@ -240,6 +254,34 @@ def test_configure_formatter_with_filename():
     assert lineno == expected_lineno
     assert func_name == expected_function
 
+@pytest.mark.parametrize(
+    'filters,expected',
+    [
+        ('CH1:info,CH2:debug', {'CH1': 'info', 'CH2': 'debug'}),
+        ('CH1:14', {'CH1': '14'}),
+        ('CH1:info,', {'CH1': 'info'}),
+        ('CH1:info:debug,CH2:error', {'CH2': 'error'}),
+        ('CH1:notalevel,CH2:error', {'CH2': 'error'}),
+        ('CH1', {}),
+    ],
+)
+def test_configure_parse_str_filters(filters, expected):
+    '''Test that filter strings are parsed into a channel map and that invalid
+    entries are dropped
+    '''
+    assert alog._parse_str_of_filters(filters) == expected
+
+def test_configure_dict_filters_with_invalid_entry():
+    '''Test that configuring with a dict of filters containing an invalid
+    level drops that entry without modifying the caller's dict
+    '''
+    filters = {'CH1': 'error', 'CH2': 'notalevel', 'CH3': 14}
+    alog.configure(default_level='info', filters=filters)
+    assert filters == {'CH1': 'error', 'CH2': 'notalevel', 'CH3': 14}
+    assert not alog.use_channel('CH1').isEnabled('info')
+    assert alog.use_channel('CH2').isEnabled('info')
+    assert alog.use_channel('CH3').isEnabled('trace')
+
 @pytest.mark.parametrize(
     'configure_kwargs',
     [
@@ -332,6 +374,39 @@ def test_json_with_functions():
     assert 'level' in logged_output[0]
     assert logged_output[0]['level'].lower() == logged_output[0]['level']
 
+def test_json_non_ascii_escaped():
+    '''Make sure that the default json output escapes non-ASCII characters
+    so that it can be written to ASCII streams
+    '''
+    capture_formatter = LogCaptureFormatter('json')
+    alog.configure(default_level='info', formatter=capture_formatter)
+    alog.use_channel('TEST').info('caf\u00e9')
+    assert len(capture_formatter.captured) == 1
+    assert '"caf\\u00e9"' in capture_formatter.captured[0]
+    assert json.loads(capture_formatter.captured[0])['message'] == 'caf\u00e9'
+
+def test_json_orjson_opt_in():
+    '''Make sure that orjson is only used when explicitly requested and that
+    values it can't handle, such as integers wider than 64 bits, still encode
+    '''
+    pytest.importorskip('orjson')
+    capture_formatter = LogCaptureFormatter(alog.AlogJsonFormatter(use_orjson=True))
+    alog.configure(default_level='info', formatter=capture_formatter)
+    test_channel = alog.use_channel('TEST')
+
+    test_channel.info({'message': 'caf\u00e9'})
+    test_channel.info({'big': 2 ** 70})
+    logged_output = capture_formatter.get_json_records()
+    assert len(logged_output) == 2
+    assert logged_output[0]['message'] == 'caf\u00e9'
+    assert logged_output[1]['big'] == 2 ** 70
+
+def test_json_orjson_not_installed():
+    '''Make sure that requesting orjson without it installed is an error'''
+    with mock.patch.object(alog, 'orjson', None):
+        with pytest.raises(ValueError):
+            alog.AlogJsonFormatter(use_orjson=True)
+
 def test_log_code_json_function():
     '''Test that logging with a log code and the json formatter with a function works as expected.
     '''
@@ -352,12 +427,198 @@ def test_log_code_json_function():
     assert 'message' in record
     assert record['message'] == f"Logging 2 functions, {is_log_msg} and {pretty_level_to_name}"
 
+## Pretty ######################################################################
+
+def test_pretty_metadata_multiple_handlers():
+    '''Make sure that a dict message with metadata formats identically when the
+    same record is formatted more than once (e.g. for multiple handlers)
+    '''
+    formatter = alog.AlogPrettyFormatter()
+    msg = {'log_code': test_code, 'message': 'test %d', 'args': (1,), 'key': 'val'}
+    record = logging.LogRecord('TEST', logging.INFO, '', 0, msg, None, None)
+    first = formatter.format(record)
+    second = formatter.format(record)
+    assert first == second
+    parsed = parse_pretty_line(first)
+    assert parsed['log_code'] == test_code
+    assert parsed['message'] == 'test 1 {"key": "val"}'
+
+def test_pretty_filter_on_second_handler():
+    '''Make sure that a filter on a second handler which rewrites the message
+    is honored when both handlers share the same pretty formatter
+    '''
+    class RedactFilter(logging.Filter):
+        def filter(self, record):
+            record.msg = 'password=***'
+            record.args = None
+            return True
+
+    formatter = alog.AlogPrettyFormatter()
+    plain_stream = io.StringIO()
+    plain_handler = logging.StreamHandler(plain_stream)
+    plain_handler.setFormatter(formatter)
+    redacted_stream = io.StringIO()
+    redacted_handler = logging.StreamHandler(redacted_stream)
+    redacted_handler.setFormatter(formatter)
+    redacted_handler.addFilter(RedactFilter())
+
+    logger = logging.getLogger('pretty-redact-test')
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    logger.addHandler(plain_handler)
+    logger.addHandler(redacted_handler)
+    try:
+        logger.info('password=%s', 'hunter2')
+    finally:
+        logger.removeHandler(plain_handler)
+        logger.removeHandler(redacted_handler)
+
+    assert parse_pretty_line(plain_stream.getvalue())['message'] == 'password=hunter2'
+    assert parse_pretty_line(redacted_stream.getvalue())['message'] == 'password=***'
+
+def test_pretty_dict_message_not_modified():
+    '''Make sure that logging a dict message with the pretty formatter does not
+    modify the caller's dict so that it can be reused
+    '''
+    capture_formatter = LogCaptureFormatter('pretty')
+    alog.configure(default_level='info', formatter=capture_formatter)
+    test_channel = alog.use_channel('TEST')
+
+    msg = {'log_code': test_code, 'message': 'test', 'key': 'val'}
+    test_channel.info(msg)
+    test_channel.info(msg)
+    assert msg == {'log_code': test_code, 'message': 'test', 'key': 'val'}
+
+    logged_output = capture_formatter.get_pretty_records()
+    assert len(logged_output) == 2
+    for record in logged_output:
+        assert record['log_code'] == test_code
+        assert record['message'] == 'test {"key": "val"}'
+
+def test_pretty_attribute_style_record_log_code():
+    '''Make sure that the log code from a dict message is used for records
+    that are not LogRecords and store their attributes as dict items (like the
+    munch records used by the json converter util)
+    '''
+    class AttrDict(dict):
+        __slots__ = ()
+        __getattr__ = dict.get
+
+        def __setattr__(self, name, value):
+            self[name] = value
+
+    record = AttrDict(
+        name='TEST',
+        levelname='INFO',
+        created=time.time(),
+        exc_info=None,
+        msg={'log_code': test_code, 'message': 'test'},
+    )
+    formatted = parse_pretty_line(alog.AlogPrettyFormatter().format(record))
+    assert formatted['log_code'] == test_code
+    assert formatted['message'] == 'test'
+
+def test_pretty_multiline_message():
+    '''Make sure that each line of a multi-line message gets its own header'''
+    capture_formatter = LogCaptureFormatter('pretty')
+    alog.configure(default_level='info', formatter=capture_formatter)
+    test_channel = alog.use_channel('TEST')
+
+    test_channel.info('line one\nline two\nline three')
+    logged_output = capture_formatter.get_pretty_records()
+    assert [entry['message'] for entry in logged_output] == [
+        'line one', 'line two', 'line three'
+    ]
+    assert all(entry['channel'] == 'TEST' for entry in logged_output)
+
+def test_pretty_direct_indent_assignment():
+    '''Make sure that setting the indent count directly (as the json converter
+    util does) is reflected in the pretty output
+    '''
+    formatter = alog.AlogPrettyFormatter()
+    record = logging.LogRecord('TEST', logging.INFO, '', 0, 'hello', None, None)
+    formatter._indent.indent = 2
+    assert parse_pretty_line(formatter.format(record))['num_indent'] == 2
+    formatter._indent.indent = 0
+    assert parse_pretty_line(formatter.format(record))['num_indent'] == 0
+
+def test_pretty_scoped_indentation():
+    '''Make sure that the pretty formatter indents lines inside of a scope and
+    removes the indentation when the scope exits
+    '''
+    capture_formatter = LogCaptureFormatter('pretty')
+    alog.configure(default_level='info', formatter=capture_formatter)
+    test_channel = alog.use_channel('TEST')
+
+    with alog.ContextLog(test_channel.info, 'outer'):
+        with alog.ContextLog(test_channel.info, 'inner'):
+            test_channel.info('Indent 2')
+        test_channel.info('Indent 1')
+    test_channel.info('Indent 0')
+
+    indents = {
+        entry['message']: entry['num_indent']
+        for entry in capture_formatter.get_pretty_records()
+    }
+    assert indents['Indent 2'] == 2
+    assert indents['Indent 1'] == 1
+    assert indents['Indent 0'] == 0
+
+## Timestamps ##################################################################
+
+def test_format_time_utc_iso():
+    '''Make sure that timestamps are formatted as UTC ISO strings with
+    microseconds, both when the second changes and when it is reused
+    '''
+    formatter = alog.AlogPrettyFormatter()
+    record = logging.LogRecord('TEST', logging.INFO, '', 0, 'test', None, None)
+    record.created = 1700000000.0
+    assert formatter.formatTime(record) == '2023-11-14T22:13:20.000000'
+    record.created = 1700000000.5
+    assert formatter.formatTime(record) == '2023-11-14T22:13:20.500000'
+    record.created = 1700000061.25
+    assert formatter.formatTime(record) == '2023-11-14T22:14:21.250000'
+
+    # Microseconds are rounded to the nearest value, carrying into the next
+    # second when needed
+    record.created = 1700000635.5707617
+    assert formatter.formatTime(record) == '2023-11-14T22:23:55.570762'
+    record.created = 1700000000.9999996
+    assert formatter.formatTime(record) == '2023-11-14T22:13:21.000000'
+
 ## Custom Formatter ############################################################
 
 def test_custom_formatter_pretty_with_args():
     '''Tests that a manually constructed AlogPrettyFormatter can be used'''
     alog.configure('info', '', formatter=alog.AlogPrettyFormatter(10))
 
+def test_pretty_channel_padding():
+    '''Make sure that channel names are padded or truncated to the configured
+    length, including when the header fragment is served from the cache
+    '''
+    capture_formatter = LogCaptureFormatter(alog.AlogPrettyFormatter(5))
+    alog.configure(default_level='info', formatter=capture_formatter)
+    short_channel = alog.use_channel('AB')
+    long_channel = alog.use_channel('ABCDEFGH')
+
+    for _ in range(2):
+        short_channel.info('short')
+        long_channel.warning('long')
+
+    assert len(capture_formatter.captured) == 4
+    for line in capture_formatter.captured[::2]:
+        assert '[AB   :INFO]' in line
+    for line in capture_formatter.captured[1::2]:
+        assert '[ABCDE:WARN]' in line
+
+    # Changing the channel length at runtime must not reuse stale headers
+    capture_formatter.formatter.channel_len = 3
+    short_channel.info('short')
+    long_channel.warning('long')
+    assert len(capture_formatter.captured) == 6
+    assert '[AB :INFO]' in capture_formatter.captured[4]
+    assert '[ABC:WARN]' in capture_formatter.captured[5]
+
 ## Thread Id ###################################################################
 
 def test_thread_id_json():
@@ -441,6 +702,33 @@ def test_log_code_arg():
     assert 'message' in record
     assert record['message'] == 'This is a test'
 
+def test_log_code_detection():
+    '''Test that only strings wrapped in angle brackets are treated as log
+    codes, and that non-string values are not
+    '''
+    assert alog.is_log_code(test_code)
+    assert alog.is_log_code('<>')
+    assert not alog.is_log_code('<')
+    assert not alog.is_log_code('>')
+    assert not alog.is_log_code('')
+    assert not alog.is_log_code('<TST93344011I')
+    assert not alog.is_log_code('TST93344011I>')
+    assert not alog.is_log_code(42)
+    assert not alog.is_log_code(None)
+
+def test_level_fn_value_kwarg():
+    '''Test that a caller's "value" kwarg cannot override the level of a level
+    function
+    '''
+    capture_formatter = LogCaptureFormatter('pretty')
+    alog.configure(default_level='info', formatter=capture_formatter)
+    test_channel = alog.use_channel('TEST')
+
+    test_channel.debug3('Should not show up', value=logging.ERROR)
+    assert len(capture_formatter.captured) == 0
+    with pytest.raises(TypeError):
+        test_channel.info('Not a valid kwarg', value=logging.ERROR)
+
 def test_log_code_with_formatting():
     '''Test that logging with a log code and formatting arguments to the message.
     '''
@@ -579,6 +867,24 @@ def test_scoped_logger_direct_function_logger():
     assert in_scope_log['num_indent'] >= 1
     assert out_scope_log['num_indent'] == 0
 
+def test_scoped_logger_function_logger_name():
+    '''Test that the scoped function logger uses the name of the calling
+    function in the begin and end messages
+    '''
+    # Configure for log capture
+    capture_formatter = LogCaptureFormatter('json')
+    alog.configure(default_level='info', formatter=capture_formatter)
+    test_channel = alog.use_channel('TEST')
+
+    def some_function():
+        _ = alog.FunctionLog(test_channel.info, 'inner')
+    some_function()
+    logged_output = capture_formatter.get_json_records()
+
+    assert len(logged_output) == 2
+    assert logged_output[0]['message'] == alog.scope_start_str + 'some_function(inner)'
+    assert logged_output[1]['message'] == alog.scope_end_str + 'some_function(inner)'
+
 def test_scoped_logger_decorated_function_logger():
     '''Test to make sure that function logger works with decorators.
     '''